@@ -0,0 +1,312 @@
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # Numba is optional: fall back to running the kernels as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+    prange = range
+
+
+# Distance reported for rays that miss every triangle
+MISS = 1e30
+
+# Fast-math flags short of assuming no infs or NaNs. The intersection kernels
+# are compiled without them: the reordered rounding lets a ray through the
+# edge shared by two neighbouring triangles, leaving holes in closed meshes
+FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+# Depth of the per-ray node stack used for BVH traversal
+STACK_SIZE = 64
+
+# Relative error bound gamma(3) on float32 slab distances, by which a box's
+# exit distance is scaled so rounding never rejects a ray that grazes it
+SLAB_TOL = 3 * 2.**-24 / (1 - 3 * 2.**-24)
+
+# Slack on the barycentric coordinates of a hit, so rounding cannot let a ray
+# slip between two triangles through the edge they share
+EDGE_TOL = 1e-6
+
+# Number of triangles intersected together in one BVH leaf pack
+PACK = 4
+
+# Rays and triangles per tile of the snapshot render kernel; 64 float32
+# triangles are about 2 KB, comfortably inside L1
+BLOCK_R = 256
+BLOCK_T = 64
+
+
+@njit(inline='always', error_model='numpy')
+def _inverse(d):
+    """Inverse of a direction component, large and finite when it is zero."""
+    return 1. / d if d != 0. else MISS
+
+
+@njit(inline='always', error_model='numpy')
+def _slab(bbox, k, ox, oy, oz, ix, iy, iz, tfar):
+    """Checks if a ray enters box k somewhere in [0, tfar].
+
+    Box k is stored as the record (xmin, ymin, zmin, xmax, ymax, zmax). The
+    test is conservative: the exit distance is scaled up by the rounding error
+    bound, so rays through the box's faces, edges and corners, or through a
+    box flat along one axis, are never rejected.
+
+    References
+    ----------
+    .. [1] Kay, T. L. and Kajiya, J. T., Ray tracing complex scenes, 1986
+    .. [2] Ize, T., Robust BVH ray traversal, 2013
+    """
+    t1 = (bbox[k, 0] - ox) * ix
+    t2 = (bbox[k, 3] - ox) * ix
+    tmin = min(t1, t2)
+    tmax = max(t1, t2)
+    t1 = (bbox[k, 1] - oy) * iy
+    t2 = (bbox[k, 4] - oy) * iy
+    tmin = max(tmin, min(t1, t2))
+    tmax = min(tmax, max(t1, t2))
+    t1 = (bbox[k, 2] - oz) * iz
+    t2 = (bbox[k, 5] - oz) * iz
+    tmin = max(tmin, min(t1, t2))
+    tmax = min(tmax, max(t1, t2)) * (1. + 2. * SLAB_TOL)
+    return tmax >= max(0., tmin) and tmin <= tfar
+
+
+@njit(inline='always', error_model='numpy')
+def _moller_trumbore4(packs, p, ox, oy, oz, dx, dy, dz, tfar):
+    """Intersects a ray with all lanes of triangle pack p at once.
+
+    Every lane runs the full test without early exits, so the lane loop is
+    branch-free up to one hit mask per lane.
+
+    Returns
+    -------
+    t, lane, u, v : float, int, float, float
+        Distance along the ray, pack lane and barycentric coordinates of the
+        closest hit nearer than tfar, with lane set to -1 if there is none.
+
+    References
+    ----------
+    .. [1] Moller, T. and Trumbore, B., Fast, minimum storage ray/triangle
+       intersection, 1997
+    """
+    best = tfar
+    lane = -1
+    bu = 0.
+    bv = 0.
+    for k in range(PACK):
+        e1x, e1y, e1z = packs[p, 3, k], packs[p, 4, k], packs[p, 5, k]
+        e2x, e2y, e2z = packs[p, 6, k], packs[p, 7, k], packs[p, 8, k]
+
+        # pvec = dir x e2
+        px = dy * e2z - dz * e2y
+        py = dz * e2x - dx * e2z
+        pz = dx * e2y - dy * e2x
+        det = e1x * px + e1y * py + e1z * pz
+        inv = 1. / det
+
+        tx, ty, tz = ox - packs[p, 0, k], oy - packs[p, 1, k], oz - packs[p, 2, k]
+        u = (tx * px + ty * py + tz * pz) * inv
+
+        # qvec = tvec x e1
+        qx = ty * e1z - tz * e1y
+        qy = tz * e1x - tx * e1z
+        qz = tx * e1y - ty * e1x
+        v = (dx * qx + dy * qy + dz * qz) * inv
+        t = (e2x * qx + e2y * qy + e2z * qz) * inv
+
+        # Rays parallel to the triangle, and padding lanes, have det == 0
+        hit = ((det != 0.) & (u >= -EDGE_TOL) & (v >= -EDGE_TOL) & (u + v <= 1. + EDGE_TOL) &
+               (t > 0.) & (t < best))
+        if hit:
+            best = t
+            lane = k
+            bu = u
+            bv = v
+    return best, lane, bu, bv
+
+
+@njit(parallel=True, error_model='numpy', cache=True)
+def traverse(orig, dirs, packs, pack_index, node_bbox, node_left, node_right,
+             node_first, node_count, out_t, out_idx, out_u, out_v):
+    """Finds the closest triangle hit by each ray by walking a BVH.
+
+    Parameters
+    ----------
+    orig : array, (N, 3)
+        Ray origins.
+    dirs : array, (N, 3)
+        Ray directions.
+    packs : array, (P, 9, PACK)
+        Triangles in BVH leaf order, PACK to a pack, stored as rows of
+        v0x, v0y, v0z, e1x, e1y, e1z, e2x, e2y, e2z with one lane per
+        triangle.
+    pack_index : array of int, (P, PACK)
+        Index of the triangle in each pack lane, -1 for padding lanes.
+    node_bbox : array, (K, 6)
+        Corners of each node's axis-aligned bounding box, packed as
+        (xmin, ymin, zmin, xmax, ymax, zmax) so a node's box is one
+        contiguous record.
+    node_left, node_right : array of int, (K,)
+        Child node indices of interior nodes.
+    node_first, node_count : array of int, (K,)
+        Range of packs held by leaf nodes; count is zero for interior nodes.
+    out_t : array, (N,)
+        Output distance along each ray to its closest hit, MISS otherwise.
+    out_idx : array of int, (N,)
+        Output index from pack_index of the closest triangle hit, -1
+        otherwise.
+    out_u, out_v : array, (N,)
+        Output barycentric coordinates of each ray's closest hit.
+    """
+    for i in prange(dirs.shape[0]):
+        ox, oy, oz = orig[i, 0], orig[i, 1], orig[i, 2]
+        dx, dy, dz = dirs[i, 0], dirs[i, 1], dirs[i, 2]
+        ix, iy, iz = _inverse(dx), _inverse(dy), _inverse(dz)
+
+        best = MISS
+        bi = -1
+        bu = 0.
+        bv = 0.
+        stack = np.empty(STACK_SIZE, dtype=np.int32)
+        stack[0] = 0
+        top = 1
+        while top > 0:
+            top -= 1
+            node = stack[top]
+
+            # Skip nodes the ray misses or that lie beyond the closest hit
+            if not _slab(node_bbox, node, ox, oy, oz, ix, iy, iz, best):
+                continue
+
+            if node_count[node] > 0:
+                first = node_first[node]
+                for p in range(first, first + node_count[node]):
+                    t, lane, u, v = _moller_trumbore4(packs, p, ox, oy, oz, dx, dy, dz, best)
+                    if lane >= 0:
+                        best = t
+                        bi = pack_index[p, lane]
+                        bu = u
+                        bv = v
+            else:
+                stack[top] = node_right[node]
+                stack[top + 1] = node_left[node]
+                top += 2
+
+        out_t[i] = best
+        out_idx[i] = bi
+        out_u[i] = bu
+        out_v[i] = bv
+
+
+@njit(inline='always', error_model='numpy')
+def _hits(V0, edge1, edge2, j, ox, oy, oz, dx, dy, dz):
+    """Checks if a ray hits triangle j in front of its origin.
+
+    References
+    ----------
+    .. [1] Moller, T. and Trumbore, B., Fast, minimum storage ray/triangle
+       intersection, 1997
+    """
+    e1x, e1y, e1z = edge1[j, 0], edge1[j, 1], edge1[j, 2]
+    e2x, e2y, e2z = edge2[j, 0], edge2[j, 1], edge2[j, 2]
+
+    # pvec = dir x e2; rays parallel to the triangle never hit
+    px = dy * e2z - dz * e2y
+    py = dz * e2x - dx * e2z
+    pz = dx * e2y - dy * e2x
+    det = e1x * px + e1y * py + e1z * pz
+    if det == 0.:
+        return False
+    inv = 1. / det
+
+    tx, ty, tz = ox - V0[j, 0], oy - V0[j, 1], oz - V0[j, 2]
+    u = (tx * px + ty * py + tz * pz) * inv
+    if u < -EDGE_TOL or u > 1. + EDGE_TOL:
+        return False
+
+    # qvec = tvec x e1
+    qx = ty * e1z - tz * e1y
+    qy = tz * e1x - tx * e1z
+    qz = tx * e1y - ty * e1x
+    v = (dx * qx + dy * qy + dz * qz) * inv
+    if v < -EDGE_TOL or u + v > 1. + EDGE_TOL:
+        return False
+
+    return (e2x * qx + e2y * qy + e2z * qz) * inv > 0.
+
+
+@njit(parallel=True, error_model='numpy', cache=True)
+def render_kernel(origins, dirs, V0, edge1, edge2, bbox, out):
+    """Flags the rays that hit any triangle.
+
+    Rays and triangles are swept in tiles of BLOCK_R by BLOCK_T, so a tile of
+    triangles stays in cache while every ray of the ray tile is tested
+    against it. Ray tiles run in parallel.
+
+    Parameters
+    ----------
+    origins : array, (R, 3)
+        Ray origins.
+    dirs : array, (R, 3)
+        Ray directions.
+    V0 : array, (T, 3)
+        First vertex of each triangle.
+    edge1, edge2 : array, (T, 3)
+        Edges from V0 to the second and third vertex of each triangle.
+    bbox : array, (T, 6)
+        Corners of each triangle's axis-aligned bounding box, packed as
+        (xmin, ymin, zmin, xmax, ymax, zmax). Rays missing a box skip the
+        Moller-Trumbore test for that triangle.
+    out : array of uint8, (R,)
+        Output flag, 1 where the ray hits a triangle in front of its origin
+        and 0 otherwise.
+    """
+    n_rays = dirs.shape[0]
+    n_tris = V0.shape[0]
+    for b in prange((n_rays + BLOCK_R - 1) // BLOCK_R):
+        r0 = b * BLOCK_R
+        r1 = min(r0 + BLOCK_R, n_rays)
+        for r in range(r0, r1):
+            out[r] = 0
+
+        for t0 in range(0, n_tris, BLOCK_T):
+            t1 = min(t0 + BLOCK_T, n_tris)
+            for r in range(r0, r1):
+                if out[r]:
+                    continue
+                ox, oy, oz = origins[r, 0], origins[r, 1], origins[r, 2]
+                dx, dy, dz = dirs[r, 0], dirs[r, 1], dirs[r, 2]
+                ix, iy, iz = _inverse(dx), _inverse(dy), _inverse(dz)
+                for j in range(t0, t1):
+                    if not _slab(bbox, j, ox, oy, oz, ix, iy, iz, MISS):
+                        continue
+                    if _hits(V0, edge1, edge2, j, ox, oy, oz, dx, dy, dz):
+                        out[r] = 1
+                        break
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def rotate_batch(xyz, rot, out):
+    """Rotates each row of xyz by a rotation matrix.
+
+    For small batches this beats the fixed dispatch cost of a BLAS matrix
+    product, since each row is only nine multiply-adds.
+
+    Parameters
+    ----------
+    xyz : array, (N, 3)
+        Vectors to rotate.
+    rot : array, (3, 3)
+        Rotation matrix.
+    out : array, (N, 3)
+        Output rotated vectors, rot . xyz[i] for each row i.
+    """
+    for i in range(xyz.shape[0]):
+        x, y, z = xyz[i, 0], xyz[i, 1], xyz[i, 2]
+        out[i, 0] = rot[0, 0] * x + rot[0, 1] * y + rot[0, 2] * z
+        out[i, 1] = rot[1, 0] * x + rot[1, 1] * y + rot[1, 2] * z
+        out[i, 2] = rot[2, 0] * x + rot[2, 1] * y + rot[2, 2] * z
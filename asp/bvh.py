@@ -0,0 +1,248 @@
+import numpy as np
+from asp import _kernels
+from asp.objects import DTYPE
+
+
+def _area(bbox_min, bbox_max):
+    """Surface area of axis-aligned boxes given their corners."""
+    ext = bbox_max - bbox_min
+    return 2. * (ext[..., 0] * ext[..., 1] + ext[..., 1] * ext[..., 2] +
+                 ext[..., 2] * ext[..., 0])
+
+
+class BVH(object):
+    """
+    Bounding volume hierarchy over triangular facets.
+
+    Triangles are partitioned top-down on their centroids using a binned
+    surface area heuristic, and reordered so each leaf holds a contiguous
+    range of them. Each leaf's triangles are then packed in groups of
+    _kernels.PACK, so traversal intersects a whole pack at once.
+
+    Attributes
+    ----------
+    tri_vertices : array, (M, 3, 3)
+        Triangle vertices in leaf order.
+    tri_index : array of int, (M,)
+        Index into the input triangles of each triangle in leaf order.
+    centroid : array, (M, 3)
+        Centroid of each triangle in leaf order.
+    packs : array, (P, 9, PACK)
+        Leaf triangles packed PACK to a pack, as rows of v0x, v0y, v0z, e1x,
+        e1y, e1z, e2x, e2y, e2z with one lane per triangle.
+    pack_index : array of int, (P, PACK)
+        Index into the input triangles of each pack lane, -1 for padding.
+    node_bbox : array, (K, 6)
+        Corners of each node's axis-aligned bounding box, packed per node as
+        (xmin, ymin, zmin, xmax, ymax, zmax).
+    node_bbox_min, node_bbox_max : array, (K, 3)
+        Views of the minimum and maximum corners in node_bbox.
+    node_left, node_right : array of int, (K,)
+        Child node indices of interior nodes, -1 for leaves.
+    node_first, node_count : array of int, (K,)
+        Range of packs held by leaf nodes; count is zero for interior nodes.
+
+    Methods
+    -------
+    traverse(rays)
+        Finds the closest triangle hit by each of a batch of rays.
+
+    References
+    ----------
+    .. [1] Wald, I., On fast construction of SAH-based bounding volume
+       hierarchies, 2007
+    """
+
+    def __init__(self, triangles, leaf_size=4, n_bins=16):
+        """Builds BVH over triangles.
+
+        Parameters
+        ----------
+        triangles : iter[Triangle] or array_like, (M, 3, 3)
+            Triangular facets, or their stacked vertex coordinates.
+        leaf_size : int, optional
+            Largest number of triangles held by a leaf. Default is 4.
+        n_bins : int, optional
+            Number of centroid bins evaluated per axis when splitting a node.
+            Default is 16.
+
+        Returns
+        -------
+        BVH
+            Instantiation of BVH.
+        """
+        if not isinstance(triangles, np.ndarray):
+            triangles = [triangle.vertices for triangle in triangles]
+        tris = np.ascontiguousarray(triangles, dtype=DTYPE).reshape(-1, 3, 3)
+        self._tri_min = tris.min(axis=1)
+        self._tri_max = tris.max(axis=1)
+        self._centroid = tris.mean(axis=1)
+        self._n_bins = n_bins
+
+        # Interior nodes always split in two, so a tree never has more nodes
+        n_max = max(2 * tris.shape[0] - 1, 1)
+
+        # Node boxes are packed so traversal fetches each in one record, and
+        # node indices are int32 to halve the bytes moved per node
+        self.node_bbox = np.empty((n_max, 6), dtype=DTYPE)
+        self.node_left = np.full(n_max, -1, dtype=np.int32)
+        self.node_right = np.full(n_max, -1, dtype=np.int32)
+        self.node_first = np.zeros(n_max, dtype=np.int32)
+        self.node_count = np.zeros(n_max, dtype=np.int32)
+
+        # Traversal keeps one stack slot per level, so cap the depth to fit
+        max_depth = _kernels.STACK_SIZE - 1
+        # An empty scene gets no nodes at all, and every ray misses it
+        order = np.arange(tris.shape[0])
+        n_nodes = 1 if tris.shape[0] else 0
+        stack = [(0, 0, tris.shape[0], 0)] if tris.shape[0] else []
+        while stack:
+            node, start, end, depth = stack.pop()
+            idx = order[start:end]
+            self.node_bbox[node, :3] = self._tri_min[idx].min(axis=0)
+            self.node_bbox[node, 3:] = self._tri_max[idx].max(axis=0)
+
+            left_mask = None
+            if end - start > leaf_size and depth < max_depth:
+                left_mask = self._split(idx)
+            if left_mask is None:
+                self.node_first[node] = start
+                self.node_count[node] = end - start
+                continue
+
+            mid = start + np.count_nonzero(left_mask)
+            order[start:end] = np.concatenate([idx[left_mask], idx[~left_mask]])
+            self.node_left[node] = n_nodes
+            self.node_right[node] = n_nodes + 1
+            stack.append((n_nodes, start, mid, depth + 1))
+            stack.append((n_nodes + 1, mid, end, depth + 1))
+            n_nodes += 2
+
+        self.node_bbox = self.node_bbox[:n_nodes]
+        self.node_bbox_min = self.node_bbox[:, :3]
+        self.node_bbox_max = self.node_bbox[:, 3:]
+        self.node_left = self.node_left[:n_nodes]
+        self.node_right = self.node_right[:n_nodes]
+        self.node_first = self.node_first[:n_nodes]
+        self.node_count = self.node_count[:n_nodes]
+
+        self.tri_index = order
+        self.tri_vertices = tris[order]
+        self.centroid = self._centroid[order]
+        self._pack()
+
+    def _pack(self):
+        """Packs each leaf's triangles into SoA groups of _kernels.PACK.
+
+        Leaves are padded with degenerate triangles, which never hit, up to a
+        whole number of packs, and node_first and node_count are rewritten to
+        index packs rather than triangles.
+        """
+        width = _kernels.PACK
+        leaves = np.flatnonzero(self.node_count)
+        n_packs = -(-self.node_count[leaves] // width)
+        pack_first = np.concatenate([[0], np.cumsum(n_packs)[:-1]])
+
+        # Slot of every triangle in the flattened (pack, lane) layout
+        slots = np.empty(len(self.tri_index), dtype=np.intp)
+        for leaf, first in zip(leaves, pack_first):
+            start = self.node_first[leaf]
+            count = self.node_count[leaf]
+            slots[start:start + count] = first * width + np.arange(count)
+
+        v0 = self.tri_vertices[:, 0]
+        fields = np.concatenate([v0, self.tri_vertices[:, 1] - v0,
+                                 self.tri_vertices[:, 2] - v0], axis=1)
+        packs = np.zeros((n_packs.sum() * width, 9), dtype=DTYPE)
+        packs[slots] = fields
+        self.packs = np.ascontiguousarray(packs.reshape(-1, width, 9).transpose(0, 2, 1))
+        pack_index = np.full(n_packs.sum() * width, -1, dtype=np.int32)
+        pack_index[slots] = self.tri_index
+        self.pack_index = pack_index.reshape(-1, width)
+
+        self.node_first[leaves] = pack_first
+        self.node_count[leaves] = n_packs
+
+    def _split(self, idx):
+        """Finds the cheapest binned SAH split of triangles idx.
+
+        Returns
+        -------
+        left_mask : array of bool or None
+            True for triangles going to the left child, None if the centroids
+            cannot be separated.
+        """
+        c = self._centroid[idx]
+        c_min = c.min(axis=0)
+        c_max = c.max(axis=0)
+        n = len(idx)
+
+        best_cost = np.inf
+        best_mask = None
+        for axis in range(3):
+            extent = c_max[axis] - c_min[axis]
+            if extent <= 0:
+                continue
+
+            # Bin triangles by centroid and accumulate each bin's bounds
+            bins = ((c[:, axis] - c_min[axis]) * (self._n_bins / extent)).astype(np.intp)
+            bins = np.minimum(bins, self._n_bins - 1)
+            counts = np.bincount(bins, minlength=self._n_bins)
+            lo = np.full((self._n_bins, 3), np.inf, dtype=DTYPE)
+            hi = np.full((self._n_bins, 3), -np.inf, dtype=DTYPE)
+            np.minimum.at(lo, bins, self._tri_min[idx])
+            np.maximum.at(hi, bins, self._tri_max[idx])
+
+            # Cost of splitting after each bin, sweeping from both ends
+            n_left = np.cumsum(counts)[:-1]
+            n_right = n - n_left
+            with np.errstate(invalid='ignore'):
+                area_left = _area(np.minimum.accumulate(lo)[:-1],
+                                  np.maximum.accumulate(hi)[:-1])
+                area_right = _area(np.minimum.accumulate(lo[::-1])[::-1][1:],
+                                   np.maximum.accumulate(hi[::-1])[::-1][1:])
+                cost = n_left * area_left + n_right * area_right
+            cost[(n_left == 0) | (n_right == 0)] = np.inf
+
+            k = np.argmin(cost)
+            if cost[k] < best_cost:
+                best_cost = cost[k]
+                best_mask = bins <= k
+
+        return best_mask
+
+    def traverse(self, rays):
+        """Finds the closest triangle hit by each of a batch of rays.
+
+        Parameters
+        ----------
+        rays : RayBatch
+            Rays to trace.
+
+        Returns
+        -------
+        t : array, (N,)
+            Distance along each ray to its closest hit, inf where it misses.
+        idx : array of int, (N,)
+            Index into the input triangles of the closest triangle hit by each
+            ray, -1 where it misses.
+        u, v : array, (N,)
+            Barycentric coordinates of each ray's closest hit.
+        """
+        n = len(rays)
+        if not len(self.node_count):
+            return (np.full(n, np.inf, dtype=DTYPE), np.full(n, -1, dtype=np.int64),
+                    np.zeros(n, dtype=DTYPE), np.zeros(n, dtype=DTYPE))
+
+        t = np.empty(n, dtype=DTYPE)
+        idx = np.empty(n, dtype=np.int64)
+        u = np.empty(n, dtype=DTYPE)
+        v = np.empty(n, dtype=DTYPE)
+
+        # Padding lanes divide by a zero determinant, which is harmless
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _kernels.traverse(rays.origin, rays.dir, self.packs, self.pack_index,
+                              self.node_bbox, self.node_left, self.node_right,
+                              self.node_first, self.node_count, t, idx, u, v)
+        t[idx < 0] = np.inf
+        return t, idx, u, v
@@ -1,5 +1,6 @@
 import numpy as np
-from asp.objects import Point, Vector
+from asp.bvh import BVH
+from asp.objects import Point, _cross3, _norm3
 
 
 def add(points):
@@ -10,13 +11,15 @@ def add(points):
     points : iter[Points]
         Iterable of Point objects.
 
-    added : Point
+    Returns
+    -------
+    Point
         Point with added xyz coordinates of all Points in input.
     """
-    sum = points[0].xyz
-    for point in Points[1:]:
-        sum += point.xyz
-    return Point(sum)
+    if len(points) == 2:
+        return Point(points[0].xyz + points[1].xyz)
+    xyz = np.asarray([point.xyz for point in points])
+    return Point(xyz.sum(axis=0))
 
 
 def mul(points):
@@ -27,13 +30,15 @@ def mul(points):
     points : iter[Points]
         Iterable of Point objects.
 
+    Returns
+    -------
     Point
         Point with multiplied xyz coordinates of all Points in input.
     """
-    prod = points[0].xyz
-    for point in Points[1:]:
-        prod *= point.xyz
-    return Point(prod)
+    if len(points) == 2:
+        return Point(points[0].xyz * points[1].xyz)
+    xyz = np.asarray([point.xyz for point in points])
+    return Point(np.prod(xyz, axis=0))
 
 
 def sub(points):
@@ -44,68 +49,109 @@ def sub(points):
     points : iter[Points]
         Iterable of Point objects.
 
+    Returns
+    -------
     Point
         Point with subtracted xyz coordinates of all Points in input.
     """
-    diff = points[0].xyz
-    for point in Points[1:]:
-        diff -= point.xyz
-    return Point(diff)   
+    if len(points) == 2:
+        return Point(points[0].xyz - points[1].xyz)
+    xyz = np.asarray([point.xyz for point in points])
+    return Point(np.subtract.reduce(xyz, axis=0))
 
 
 def div(points):
-    """Sequentially subtracts iterable of Points.
+    """Sequentially divides iterable of Points.
     
     Parameters
     ----------
     points : iter[Points]
         Iterable of Point objects.
 
+    Returns
+    -------
     Point
-        Point with subtracted xyz coordinates of all Points in input.
+        Point with divided xyz coordinates of all Points in input.
     """
-    quo = points[0].xyz
-    for point in Points[1:]:
-        quo /= point.xyz
-    return Point(quo)  
+    if len(points) == 2:
+        return Point(points[0].xyz / points[1].xyz)
+    xyz = np.asarray([point.xyz for point in points])
+    return Point(np.divide.reduce(xyz, axis=0))
 
 
-def intersect(vector, plane):
-    """Computes the intersection Point of a Vector and Plane
+def ray_triangle(orig, dir, V1, V2, V3):
+    """Intersects rays with a triangle in a single Moller-Trumbore pass.
 
-    Parameters 
+    Parameters
     ----------
-    vector : Vector
-        Vector to intersect with plane.
-    plane : Plane
-        Plane for Vector to intersect.
+    orig : array_like, (3,) or (N, 3)
+        Ray origin(s).
+    dir : array_like, (3,) or (N, 3)
+        Ray direction(s).
+    V1, V2, V3 : array_like, (3,)
+        Triangle vertices.
 
     Returns
     -------
-    Point
-        Intersection Point of Plane and Vector.
+    t : float or array, (N,)
+        Distance along each ray to the triangle's supporting plane, in units
+        of the ray direction length.
+    u, v : float or array, (N,)
+        Barycentric coordinates of the intersection along edges V2 - V1 and
+        V3 - V1.
+    hit : bool or array of bool, (N,)
+        True where the ray hits the triangle in front of its origin.
 
-    References 
-    -----------
-    .. [1] https://www.khanacademy.org/partner-content/pixar/rendering/rendering-2/v/rendering-9
-    .. [2] Curless, B., Ray-triangle intersection, 2006
+    References
+    ----------
+    .. [1] Moller, T. and Trumbore, B., Fast, minimum storage ray/triangle
+       intersection, 1997
     """
+    orig = np.asarray(orig)
+    dir = np.asarray(dir)
 
-    # Plane equation a, b, c (normal vector) and d coefficients
-    plane_coeffs = plane.get_coefficients(plane)
-    abc = plane_coeffs[:3]
-    d = plane_coeffs[3]
+    # Triangle edges sharing vertex V1
+    e1 = np.subtract(V2, V1)
+    e2 = np.subtract(V3, V1)
 
-    # Vector origin 
-    p = vector.xyz
+    # Rays parallel to the triangle have a zero determinant and never hit
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pvec = np.cross(dir, e2)
+        inv = 1. / (pvec * e1).sum(axis=-1)
+        tvec = orig - V1
+        u = (tvec * pvec).sum(axis=-1) * inv
+        qvec = np.cross(tvec, e1)
+        v = (dir * qvec).sum(axis=-1) * inv
+        t = (qvec * e2).sum(axis=-1) * inv
+        hit = (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 0)
 
-    # Compute distance along vector, t
-    t = (d - np.dot(abc, p)) / (abc, d)
+    return t, u, v, hit
 
-    # Compute intersection using t
-    q = p + t * d
 
-    return Point(q)
+def trace(rays, triangles):
+    """Finds the closest triangle hit by each of a batch of rays.
+
+    Parameters
+    ----------
+    rays : RayBatch
+        Rays to trace, e.g. RayBatch(camera.orient.xyz,
+        camera.generate_rays()), whose rows reshape to camera.array_size.
+    triangles : BVH, iter[Triangle] or array_like, (M, 3, 3)
+        Prebuilt BVH over the scene, or the triangular facets (or their
+        stacked vertex coordinates) to build one over.
+
+    Returns
+    -------
+    t : array, (N,)
+        Distance along each ray to its closest hit, inf where it misses.
+    idx : array of int, (N,)
+        Index of the closest triangle hit by each ray, -1 where it misses.
+    u, v : array, (N,)
+        Barycentric coordinates of each ray's closest hit.
+    """
+    if not isinstance(triangles, BVH):
+        triangles = BVH(triangles)
+    return triangles.traverse(rays)
 
 
 def inside(point, triangle):
@@ -114,28 +160,38 @@ def inside(point, triangle):
     Parameters
     ----------
     point : Point
-        Point in same plane as triangle. 
+        Point in same plane as triangle. Its xyz may also be an (N, 3) array
+        to test N points at once.
     triangle : Triangle
         Triangle facet.
 
     Returns
     -------
-    in : bool
+    in : bool or array of bool, (N,)
         True of point is inside triangle, False otherwise.
 
+    Notes
+    -----
+    To test whether rays hit a triangle, use ray_triangle instead of
+    intersecting with the plane and calling this, since Moller-Trumbore
+    yields the barycentric coordinates as part of the intersection.
+
     References
     ----------
     .. [1] https://www.khanacademy.org/partner-content/pixar/rendering/rendering-2/v/rendering-9
     .. [2] Curless, B., Ray-triangle intersection, 2006
+    .. [3] Moller, T. and Trumbore, B., Fast, minimum storage ray/triangle
+       intersection, 1997
     """
-    n = triangle.normal
-    c0 = np.cross(sub([triangle.points[1], triangle.points[0]]),
-                  sub([triangle.points[2], triangle.points[0]]))
-    c1 = np.cross(sub([triangle.points[0], triangle.points[1]]),
-                  sub([triangle.points[2], triangle.points[1]]))
-    c2 = np.cross(sub([triangle.points[0], triangle.points[2]]),
-                  sub([triangle.points[1], triangle.points[2]]))
-    return (c0.dot(n) >= 0) and (c1.dot(n) >= 0) and (c2.dot(n) >= 0)
+    V1, u, v, uu, uv, vv, inv_det = triangle.barycentric
+
+    # Barycentric coordinates of point relative to V1 along edges u and v
+    w = point.xyz - V1
+    wu = w.dot(u)
+    wv = w.dot(v)
+    s = (uv * wv - vv * wu) * inv_det
+    t = (uv * wu - uu * wv) * inv_det
+    return (s >= 0) & (t >= 0) & (s + t <= 1)
 
 
 def rotation_matrix(a, b):
@@ -154,27 +210,35 @@ def rotation_matrix(a, b):
 
     Notes
     -----
-    Assumes both Vector xyz's (locations) are at origin (0, 0, 0).
+    Assumes both Vector xyz's (locations) are at origin (0, 0, 0). When a and
+    b point in opposite directions the rotation is by pi about an axis
+    orthogonal to a.
 
     References
     ----------
     .. [1] http://math.stackexchange.com/questions/180418/calculate-rotation-matrix-to-align-vector-a-to-vector-b-in-3d 
     """
     # Make sure a and b vectors are unit
-    a = a / np.linalg.norm(a.dir)
-    b = b / np.linalg.norm(b.dir)
+    a = a.dir / _norm3(a.dir)
+    b = b.dir / _norm3(b.dir)
 
     # Find sin and cos of angle to rotate by
-    v = np.cross(a, b) 
-    s = np.linalg.norm(v)
-    c = np.dot(a, b)
+    v = _cross3(a, b)
+    s = _norm3(v)
+    c = a.dot(b)
+
+    # Antiparallel vectors leave the rotation axis undefined, so turn by pi
+    # about the axis orthogonal to a and its smallest component
+    if s == 0 and c < 0:
+        n = _cross3(a, np.eye(3)[np.argmin(np.abs(a))])
+        n /= _norm3(n)
+        return 2. * np.outer(n, n) - np.eye(3)
 
-    # Define skew-symmetric cross product of v
-    vx = [[0, -v[2], v[1]], [v[2], 0, -v[0]], [-v[1], v[0], 0]]
+    # Skew-symmetric cross product matrix of v
+    K = np.array([[0, -v[2], v[1]], [v[2], 0, -v[0]], [-v[1], v[0], 0]])
 
-    # Construct rotation matrix
-    rot = np.eye(3) + vx + (vx ** 2 * ((1 - c) / s ** 2))
-    return rot
+    # Rodrigues' formula
+    return np.eye(3) + K + K.dot(K) * ((1 - c) / (s * s + 1e-30))
 
 
 def rotate(vector, matrix):
@@ -182,15 +246,17 @@ def rotate(vector, matrix):
 
     Parameters
     ----------
-    vector : Vector
-        A vector to rotate.
+    vector : Vector or RayBatch
+        A vector to rotate, or a batch of rays whose (N, 3) directions are
+        all rotated in one matrix product.
     matrix : array_like, (3, 3)
         A rotation matrix used to rotate input vector.
 
     Returns
     -------
-    Vector
+    Vector or RayBatch
         Rotated input vector.
     """
-    vector.dir = np.dot(vector.dir, matrix)
+    matrix = np.asarray(matrix, dtype=vector.dir.dtype)
+    vector.dir = vector.dir @ matrix.T
     return vector
@@ -1,5 +1,41 @@
+import math
+
 import numpy as np
-from asp.math import rotation_matrix, rotate
+from asp import _kernels
+
+
+# Single precision is ample for visibility and halves memory traffic
+DTYPE = np.float32
+
+# Smallest ray batch rotated with a BLAS matrix product rather than a
+# compiled loop, below which BLAS dispatch overhead dominates
+_BLAS_MIN_ROWS = 1024
+
+
+def _as_xyz(xyz, dtype):
+    """Returns coordinates as an array of dtype, skipping coercion if they are
+    already a 1-D array of dtype."""
+    if type(xyz) is np.ndarray and xyz.ndim == 1 and xyz.dtype == dtype:
+        return xyz
+    xyz = np.ascontiguousarray(xyz, dtype=dtype)
+    if xyz.ndim != 1 and xyz.size == 3:
+        xyz = xyz.reshape(3)
+    return xyz
+
+
+def _cross3(a, b):
+    """Cross product of two 3-vectors, without np.cross's broadcasting
+    overhead."""
+    return np.array((a[1] * b[2] - a[2] * b[1],
+                     a[2] * b[0] - a[0] * b[2],
+                     a[0] * b[1] - a[1] * b[0]))
+
+
+def _norm3(a):
+    """Euclidean length of a 3-vector, without np.linalg.norm's dispatch
+    overhead."""
+    x, y, z = float(a[0]), float(a[1]), float(a[2])
+    return math.sqrt(x * x + y * y + z * z)
 
 
 class Point(object):
@@ -18,6 +54,8 @@ class Point(object):
     shiftto(xyz=xyz)
         Shifts Point to specified location.
     """
+
+    __slots__ = ('xyz',)
     
     def __init__(self, xyz):
         """Initializes Point object.
@@ -32,7 +70,7 @@ class Point(object):
         Point
             Instantiation of Point.
         """
-        self.xyz = np.asarray(xyz).squeeze()
+        self.xyz = _as_xyz(xyz, DTYPE)
 
     def shiftby(self, xyz):
         """Shifts Point object by specified distances.
@@ -46,7 +84,7 @@ class Point(object):
         -------
         self : Updated Point object.
         """
-        self.xyz += np.asarray(xyz).squeeze()
+        self.xyz += xyz
         return self
 
     def shiftto(self, xyz):
@@ -61,10 +99,43 @@ class Point(object):
         -------
         self : Updated Point object.
         """
-        self.xyz = np.asarray(xyz).squeeze()
+        self.xyz = _as_xyz(xyz, DTYPE)
         return self
 
 
+class PointArray(object):
+    """
+    Batch of points in R3 stored as one contiguous array.
+
+    Attributes
+    ----------
+    xyz : array, (N, 3)
+        Contiguous float32 array of point coordinates in R3.
+    """
+
+    def __init__(self, xyz):
+        """Initializes PointArray object.
+
+        Parameters
+        ----------
+        xyz : array_like, (N, 3)
+            Coordinates in R3 of each point in the batch.
+
+        Returns
+        -------
+        PointArray
+            Instantiation of PointArray.
+        """
+        self.xyz = np.ascontiguousarray(xyz, dtype=DTYPE).reshape(-1, 3)
+
+    def __len__(self):
+        return self.xyz.shape[0]
+
+    def __getitem__(self, index):
+        """Returns a Point viewing a single row of the batch."""
+        return Point(self.xyz[index])
+
+
 class Vector(Point):
     """
     Represents a vector in R3.
@@ -86,6 +157,8 @@ class Vector(Point):
         Shifts Vector to specified location.
     """
 
+    __slots__ = ('dir',)
+
     def __init__(self, xyz, dir):
         """Initializes a Vector object.
 
@@ -101,15 +174,16 @@ class Vector(Point):
         Vector
             Instantiation of Vector.
         """
-        self.dir = np.asarray(dir).squeeze()
-        super(Vector).__init__(xyz)
+        self.dir = _as_xyz(dir, DTYPE)
+        super().__init__(xyz)
 
 
 class Ray(Vector):
     """
     Represents a ray in R3.
 
-    A Ray is a Vector with an associated value.
+    A Ray is a Vector with an associated value. For many rays at once, such
+    as every pixel of a Camera, prefer a RayBatch.
 
     Attributes
     ----------
@@ -128,6 +202,8 @@ class Ray(Vector):
         Shifts Ray to specified location.
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, xyz, dir, value=0.):
         """Initializes a Ray object.
 
@@ -145,8 +221,54 @@ class Ray(Vector):
         Ray
             Instantiation of Ray.
         """
-        self.value = np.asarray(value).squeeze()
-        super(Ray).__init__(xyz, dir)
+        self.value = DTYPE(value)
+        super().__init__(xyz, dir)
+
+
+class RayBatch(object):
+    """
+    Batch of rays in R3 stored as contiguous arrays.
+
+    Attributes
+    ----------
+    origin : array, (N, 3)
+        Contiguous float32 array of ray origins.
+    dir : array, (N, 3)
+        Contiguous float32 array of ray directions.
+    value : array, (N,)
+        Value or weight assigned to each ray.
+    """
+
+    __slots__ = ('origin', 'dir', 'value')
+
+    def __init__(self, origin, dir, value=0.):
+        """Initializes RayBatch object.
+
+        Parameters
+        ----------
+        origin : array_like, (3,) or (N, 3)
+            Ray origin(s), e.g. a camera location shared by every ray.
+        dir : array_like, (N, 3)
+            Ray directions.
+        value : float or array_like, (N,), optional
+            Value or weight assigned to each ray. Default is 0.
+
+        Returns
+        -------
+        RayBatch
+            Instantiation of RayBatch.
+        """
+        self.dir = np.ascontiguousarray(dir, dtype=DTYPE).reshape(-1, 3)
+        n = self.dir.shape[0]
+        self.origin = np.ascontiguousarray(np.broadcast_to(origin, (n, 3)), dtype=DTYPE)
+        self.value = np.ascontiguousarray(np.broadcast_to(value, (n,)), dtype=DTYPE)
+
+    def __len__(self):
+        return self.dir.shape[0]
+
+    def __getitem__(self, index):
+        """Returns a Ray viewing a single ray of the batch."""
+        return Ray(self.origin[index], self.dir[index], self.value[index])
 
 
 class Plane(object):
@@ -158,72 +280,83 @@ class Plane(object):
     points : iter[Point]
         Iterable of at least three Points.
     normal : Vector
-        Unit normal Vector of plane.
+        Unit normal Vector of plane, located at the origin.
 
     Methods
     -------
     get_coefficients()
         Returns coefficients of scalar plane equation.
+
+    References
+    ----------
+    .. [1] http://tutorial.math.lamar.edu/Classes/CalcIII/EqnsOfPlanes.aspx
     """
 
+    __slots__ = ('_points', '_pts', '_e1', '_e2', '_unit_normal', '_coeffs', 'normal')
+
     def __init__(self, points):
-        """Initializes Plane object."""
-        self._points = list(points)
-        self._normal = None
+        """Initializes Plane object.
+
+        Parameters
+        ----------
+        points : iter[Point] or array_like, (N, 3)
+            Points, or an array of point coordinates, defining the Plane.
+        """
+        if isinstance(points, PointArray):
+            points = points.xyz
+        if isinstance(points, np.ndarray):
+            self._pts = np.array(points, dtype=DTYPE).reshape(-1, 3)
+        else:
+            self._pts = np.stack([point.xyz for point in list(points)], dtype=DTYPE)
+
+        # The plane owns a read-only copy of its coordinates, and hands out
+        # Points copied from it, so the values derived below never go stale
+        self._pts.setflags(write=False)
+        self._points = [Point(xyz.copy()) for xyz in self._pts]
+
+        # Edge vectors, normal and offset are fixed once the points are known
+        self._e1 = self._pts[1] - self._pts[0]
+        self._e2 = self._pts[2] - self._pts[0]
+        self._e1.setflags(write=False)
+        self._e2.setflags(write=False)
+
+        # Normal from the cross product of the edges, written out on scalars
+        # to skip np.cross and np.linalg.norm dispatch on 3-vectors
+        e1x, e1y, e1z = self._e1.tolist()
+        e2x, e2y, e2z = self._e2.tolist()
+        nx = e1y * e2z - e1z * e2y
+        ny = e1z * e2x - e1x * e2z
+        nz = e1x * e2y - e1y * e2x
+        # Degenerate (zero area) facets, common in real meshes, get a NaN normal
+        length = math.sqrt(nx * nx + ny * ny + nz * nz)
+        inv = 1. / length if length > 0. else math.nan
+        self._unit_normal = np.array((nx * inv, ny * inv, nz * inv), dtype=DTYPE)
+        self._coeffs = np.empty(4, dtype=DTYPE)
+        self._coeffs[:3] = self._unit_normal
+        self._coeffs[3] = -self._unit_normal.dot(self._pts[0])
+        self._coeffs.setflags(write=False)
+
+        # Built once here so reading the normal is a plain attribute lookup
+        self.normal = Vector(np.zeros(3), self._unit_normal)
 
     @property
     def points(self):
         return self._points
 
-    @property
-    def normal(self):
-        """Computes the normal unit Vector of Plane.
-        
-        Parameters
-        ----------
-        plane : Plane
-            Plane object to compute normal Vector for. 
-        Returns 
-        --------
-        Vector
-            Normal unit Vector of parameter Plane.
+    def get_coefficients(self):
+        """Returns coefficients of scalar plane equation. 
+
+        Returns
+        -------
+        array, (4,)
+            Coefficients a, b, c, d of the plane equation ax + by + cz + d = 0,
+            where (a, b, c) is the unit normal.
 
         References 
         ----------
         .. [1] http://tutorial.math.lamar.edu/Classes/CalcIII/EqnsOfPlanes.aspx 
         """
-        if self._normal is None:
-
-            # Compute two in-plane vectors
-            v1 = self.points[1].xyz - self.points[0].xyz
-            v2 = self.points[2].xyz - self.points[0].xyz
-
-            # Cross product of two in-plane vectors gives normal vector
-            norm = np.cross(v1, v2)
-            self._normal = Vector(norm / np.linalg.norm(norm))
-
-        return self._normal
-
-
-        def get_coefficients(self):
-            """Computes coefficients of scalar plane equation. 
-
-            Parameters
-            ----------
-            plane : Plane
-                A Plane object. 
-
-            Returns
-            -------
-            array
-                Coefficients of scalar plane equation.
-
-            References 
-            ----------
-            .. [1] http://tutorial.math.lamar.edu/Classes/CalcIII/EqnsOfPlanes.aspx 
-            """
-            d = self.normal.xyz.dot(self.points[0].xyz)
-            return self.normal.xyz.append(d) 
+        return self._coeffs
 
 
 class Triangle(Plane):
@@ -236,19 +369,75 @@ class Triangle(Plane):
         Iterable of at least three Points.
     normal : Vector
         Unit normal Vector of plane.
+    vertices : array, (3, 3)
+        Coordinates of the three vertices, one per row.
+    v0 : array, (3,)
+        First vertex of the Triangle.
+    edge1, edge2 : array, (3,)
+        Edges from v0 to the second and third vertex.
+    bbox_min, bbox_max : array, (3,)
+        Corners of the Triangle's axis-aligned bounding box.
+    barycentric : tuple
+        Triangle-invariant terms of the barycentric point-in-triangle test.
 
     Methods
     -------
     get_coefficients()
         Returns coefficients of scalar plane equation for the Triangle's supporting
         plane.
+
+    Notes
+    -----
+    A Triangle's geometry is fixed once it is built. It keeps a read-only
+    copy of its vertex coordinates, and points holds copies of them, so
+    moving the Points it was built from, or its own points, does not move
+    it. Build a new Triangle to move a facet.
     """
+
+    __slots__ = ('vertices', 'v0', 'edge1', 'edge2', 'bbox_min', 'bbox_max', '_barycentric')
         
     def __init__(self, points):
         if len(points) != 3:
             raise ValueError("Triangle objects are defined by exactly 3 points.")
 
-        super(Triangle).__init__(points)
+        super().__init__(points)
+        self.vertices = self._pts
+        self.v0 = self._pts[0]
+        self.edge1 = self._e1
+        self.edge2 = self._e2
+        self.bbox_min = self._pts.min(axis=0)
+        self.bbox_max = self._pts.max(axis=0)
+        self.bbox_min.setflags(write=False)
+        self.bbox_max.setflags(write=False)
+        self._barycentric = None
+
+    @property
+    def barycentric(self):
+        """Computes the triangle-invariant terms of the barycentric test.
+
+        Returns
+        -------
+        tuple
+            First vertex V1, edges u = V2 - V1 and v = V3 - V1, the dot
+            products u.u, u.v, v.v and the inverse of the determinant
+            (u.v)^2 - (u.u)(v.v).
+
+        References
+        ----------
+        .. [1] Moller, T. and Trumbore, B., Fast, minimum storage ray/triangle
+           intersection, 1997
+        """
+        if self._barycentric is None:
+            V1 = self.v0
+            u = self.edge1
+            v = self.edge2
+            uu = u.dot(u)
+            uv = u.dot(v)
+            vv = v.dot(v)
+            inv_det = 1. / (uv * uv - uu * vv)
+            self._barycentric = (V1, u, v, uu, uv, vv, inv_det)
+
+        return self._barycentric
 
 
 class Camera(object):
@@ -272,21 +461,88 @@ class Camera(object):
         self.focal = focal
         self.array_size = array_size
         self.pixel_size = pixel_size
-        
+
+    def generate_rays(self):
+        """Returns unit direction of every camera pixel ray.
+
+        Returns
+        -------
+        dirs : array, (N, 3)
+            Contiguous float32 array of unit ray directions, in the same pixel
+            order and camera pointing direction as rays, so they reshape to
+            array_size.
+        """
+        _, dirs = self.rays()
+        return dirs / np.sqrt(np.einsum('ij,ij->i', dirs, dirs))[:, None]
+
     def rays(self):
-        """Returns list of rays, one for each camera pixel."""
-
-        # Define detector coordinates and a ray for each detector pixel
-        x_size = self.array_size[0] * self.pixel_size[0]
-        y_size = self.array_size[1] * self.pixel_size[1]
-        x = np.arange(-x_size / 2., x_size / 2, self.pixel_size[0])
-        y = np.arange(-y_size / 2., y_size / 2, self.pixel_size[1])
-        X, Y, Z = np.meshgrid(x, y, self.focal)
-        XYZ = [X.ravel(), Y.ravel(), Z.ravel()]
-        ray_list = [Ray(xyz=self.orient.xyz, point=xyz) for xyz in XYZ]
-
-        # Rotate pixel rays according to camera pointing direction
-        rot = rotation_matrix(Vector([0, 0, 0], [0, 0, 1]), Vector([0, 0, 0], self.orient.point))
-        ray_list = [rotate(ray, rot) for ray in ray_list]
-
-        return ray_list
+        """Returns origin and direction of every camera pixel ray.
+
+        Returns
+        -------
+        origins : array, (N, 3)
+            Ray origins, all at the camera location.
+        dirs : array, (N, 3)
+            Ray directions, one row per detector pixel, rotated to the camera
+            pointing direction. Rows run over y fastest, so they reshape to
+            array_size.
+        """
+        n = self.array_size[0] * self.array_size[1]
+        if n == 0:
+            dirs = np.empty((0, 3), dtype=DTYPE)
+            return np.broadcast_to(self.orient.xyz, dirs.shape), dirs
+        origins, dirs, _ = next(self.iter_ray_tiles(tile=n))
+        return origins, dirs
+
+    def iter_ray_tiles(self, tile=65536):
+        """Yields camera pixel rays a tile at a time.
+
+        Only one tile of rays is held in memory at once, so large detectors
+        can be rendered without materializing every ray.
+
+        Parameters
+        ----------
+        tile : int, optional
+            Largest number of rays yielded at once. Default is 65536.
+
+        Yields
+        ------
+        origins : array, (R, 3)
+            Ray origins, all at the camera location.
+        dirs : array, (R, 3)
+            Ray directions rotated to the camera pointing direction, in the
+            same pixel order as rays.
+        idx : slice
+            Range of the tile's pixels in the flattened image.
+        """
+        from asp.math import rotation_matrix
+
+        # Define detector coordinates along each axis from integer pixel
+        # indices, so each axis has exactly its array_size of samples
+        W, H = self.array_size
+        x = (np.arange(W, dtype=DTYPE) - W / 2.) * DTYPE(self.pixel_size[0])
+        y = (np.arange(H, dtype=DTYPE) - H / 2.) * DTYPE(self.pixel_size[1])
+
+        rot = rotation_matrix(Vector([0, 0, 0], [0, 0, 1]), Vector([0, 0, 0], self.orient.dir))
+        rot = rot.astype(DTYPE)
+
+        n = x.size * y.size
+        for first in range(0, n, tile):
+            last = min(first + tile, n)
+
+            # Build a ray for each pixel of the tile, with y running fastest
+            pixel = np.arange(first, last)
+            XYZ = np.empty((last - first, 3), dtype=DTYPE)
+            XYZ[:, 0] = x[pixel // y.size]
+            XYZ[:, 1] = y[pixel % y.size]
+            XYZ[:, 2] = self.focal
+
+            # Rotate the tile's rays to the camera pointing direction at once
+            if XYZ.shape[0] < _BLAS_MIN_ROWS:
+                dirs = np.empty_like(XYZ)
+                _kernels.rotate_batch(XYZ, rot, dirs)
+            else:
+                dirs = XYZ @ rot.T
+            origins = np.broadcast_to(self.orient.xyz, dirs.shape)
+
+            yield origins, dirs, slice(first, last)
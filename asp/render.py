@@ -1,30 +1,44 @@
 import numpy as np
-from asp.math import intersect, inside
+from asp import _kernels
+from asp.objects import DTYPE
 
 
-def snapshot(camera, triangles):
-    """Renders instaneous image of a scene. 
+def snapshot(camera, triangles, tile=65536):
+    """Renders instantaneous image of a scene. 
 
     Parameters
     ----------
     camera : Camera
         Camera to render scene with.
-    triangles : iter[Triangles]
+    triangles : iter[Triangle]
         Triangular facets making up scene content.
+    tile : int, optional
+        Number of camera rays generated and traced at once, which bounds the
+        memory held by rays. Default is 65536.
 
     Returns
     -------
-    image : Image
-        Spatial, spectral rendered image of scene. 
+    image : array of uint8, camera.array_size
+        Rendered image of scene, 1 where a pixel's ray hits a triangle and 0
+        otherwise.
     """
 
-    # Intersect camera rays with scene triangles 
-    image = []
-    for ray in camera.rays():
-        for triangle in triangles:
-            interection_point = intersect(ray, triangle)
-            if inside(intersection_point, triangle):
-                image.append(1)
-            else:
-                image.append(0)
-    return np.asarray(image).reshape(camera.array_size)
+    # Triangles are read several times, so an iterator must be drained once
+    triangles = list(triangles)
+    if not triangles:
+        return np.zeros(camera.array_size, dtype=np.uint8)
+
+    # Triangles as (T, 3) vertex and edges
+    V0 = np.stack([triangle.v0 for triangle in triangles], dtype=DTYPE)
+    edge1 = np.stack([triangle.edge1 for triangle in triangles], dtype=DTYPE)
+    edge2 = np.stack([triangle.edge2 for triangle in triangles], dtype=DTYPE)
+    bbox = np.stack([np.concatenate([triangle.bbox_min, triangle.bbox_max])
+                     for triangle in triangles], dtype=DTYPE)
+
+    # Intersect camera rays with scene triangles a tile at a time, writing
+    # hits straight into a flat view of the image
+    image = np.empty(camera.array_size, dtype=np.uint8)
+    flat = image.reshape(-1)
+    for origins, dirs, idx in camera.iter_ray_tiles(tile):
+        _kernels.render_kernel(origins, dirs, V0, edge1, edge2, bbox, flat[idx])
+    return image
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from asp.objects import Triangle
+
+
+def _cube(half, n):
+    """Closed, axis-aligned cube of side 2 * half centred on the origin, each
+    face split into an n by n grid of quads of two triangles."""
+    g = np.linspace(-half, half, n + 1)
+    triangles = []
+    for axis in range(3):
+        for side in (-half, half):
+            for i in range(n):
+                for j in range(n):
+                    quad = np.empty((4, 3))
+                    quad[:, axis] = side
+                    quad[:, (axis + 1) % 3] = [g[i], g[i + 1], g[i + 1], g[i]]
+                    quad[:, (axis + 2) % 3] = [g[j], g[j], g[j + 1], g[j + 1]]
+                    triangles.append(Triangle(quad[[0, 1, 2]]))
+                    triangles.append(Triangle(quad[[0, 2, 3]]))
+    return triangles
+
+
+def _edge_rays(half, n, count, seed=0):
+    """Rays from random points inside the cube aimed at random points on the
+    edges between its grid cells."""
+    rng = np.random.default_rng(seed)
+    origins = rng.uniform(-0.8 * half, 0.8 * half, (count, 3))
+    targets = rng.uniform(-half, half, (count, 3))
+    rows = np.arange(count)
+    axis = rng.integers(0, 3, count)
+    targets[rows, axis] = rng.choice([-half, half], count)
+    targets[rows, (axis + 1) % 3] = rng.choice(np.linspace(-half, half, n + 1), count)
+    return origins.astype(np.float32), (targets - origins).astype(np.float32)
+
+
+# Pixel rays at 0.2 pitch and unit focal length from the cube centre cross its
+# faces exactly on the edges between grid cells
+DIRECTIONS = [[1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1], [0, 0, -1],
+              [1, 2, 3]]
+
+
+@pytest.fixture(params=DIRECTIONS)
+def direction(request):
+    return request.param
+
+
+@pytest.fixture(scope='module')
+def cube():
+    return _cube(5., 10)
+
+
+@pytest.fixture(scope='module')
+def edge_rays():
+    return _edge_rays(5., 10, 5000)
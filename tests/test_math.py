@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from asp.bvh import BVH
+from asp.math import add, div, mul, ray_triangle, rotate, rotation_matrix, sub, trace
+from asp.objects import Camera, Point, RayBatch, Vector
+
+
+@pytest.mark.parametrize('position', [[0, 0, 0], [1, -2, 0.5]])
+def test_trace_closed_mesh_has_no_holes(cube, position, direction):
+    camera = Camera(Vector(position, direction), 1., (10, 10), (0.2, 0.2))
+    origins, dirs = camera.rays()
+    t, idx, u, v = trace(RayBatch(origins, dirs), cube)
+    assert (idx >= 0).all()
+    assert np.isfinite(t).all()
+
+
+def test_trace_hits_shared_edges(cube, edge_rays):
+    origins, dirs = edge_rays
+    t, idx, u, v = trace(RayBatch(origins, dirs), cube)
+    assert (idx >= 0).all()
+
+
+@pytest.mark.parametrize('triangles', [[], np.empty((0, 3, 3))])
+def test_trace_empty_scene(triangles):
+    rays = RayBatch([0, 0, 0], [[0, 0, 1], [1, 0, 0]])
+    t, idx, u, v = trace(rays, triangles)
+    np.testing.assert_array_equal(t, [np.inf, np.inf])
+    np.testing.assert_array_equal(idx, [-1, -1])
+
+
+@pytest.mark.parametrize('leaf_size', [3, 4, 5])
+def test_trace_matches_brute_force(leaf_size):
+    rng = np.random.default_rng(1)
+    n_tris = 101
+    centres = rng.uniform(-5, 5, (n_tris, 1, 3))
+    vertices = (centres + rng.uniform(-1, 1, (n_tris, 3, 3))).astype(np.float32)
+    origins = rng.uniform(-8, 8, (500, 3)).astype(np.float32)
+    dirs = rng.normal(size=(500, 3)).astype(np.float32)
+
+    # Closest hit over every triangle, inf where a ray hits none
+    t_all = np.full((n_tris, len(dirs)), np.inf, dtype=np.float32)
+    for k, (V1, V2, V3) in enumerate(vertices):
+        t, u, v, hit = ray_triangle(origins, dirs, V1, V2, V3)
+        t_all[k, hit] = t[hit]
+    expected_idx = np.where(np.isfinite(t_all).any(axis=0), t_all.argmin(axis=0), -1)
+    expected_t = t_all.min(axis=0)
+    assert 0 < (expected_idx < 0).sum() < len(dirs)
+
+    t, idx, u, v = trace(RayBatch(origins, dirs), BVH(vertices, leaf_size=leaf_size))
+    np.testing.assert_array_equal(idx, expected_idx)
+    np.testing.assert_allclose(t, expected_t, rtol=1e-5)
+
+
+@pytest.mark.parametrize('a, b', [([0, 0, 1], [1, 2, 3]),
+                                  ([2, -1, 0.5], [-3, 0, 1]),
+                                  ([0, 0, 1], [0, 0, 2]),
+                                  ([1, 2, 3], [-1, -2, -3]),
+                                  ([0, 0, 1], [0, 0, -1])])
+def test_rotation_matrix(a, b):
+    R = rotation_matrix(Vector([0, 0, 0], a), Vector([0, 0, 0], b))
+    a_hat = np.array(a) / np.linalg.norm(a)
+    b_hat = np.array(b) / np.linalg.norm(b)
+    np.testing.assert_allclose(R @ a_hat, b_hat, atol=1e-6)
+    np.testing.assert_allclose(np.linalg.det(R), 1., atol=1e-6)
+    np.testing.assert_allclose(R @ R.T, np.eye(3), atol=1e-6)
+
+
+def test_rotate_vector():
+    R = rotation_matrix(Vector([0, 0, 0], [0, 0, 1]), Vector([0, 0, 0], [1, 0, 0]))
+    vector = rotate(Vector([1, 2, 3], [0, 0, 2]), R)
+    np.testing.assert_allclose(vector.dir, [2, 0, 0], atol=1e-6)
+    np.testing.assert_array_equal(vector.xyz, [1, 2, 3])
+
+
+def test_rotate_ray_batch():
+    R = rotation_matrix(Vector([0, 0, 0], [1, 1, 0]), Vector([0, 0, 0], [0, 1, 2]))
+    dirs = np.random.default_rng(2).normal(size=(20, 3))
+    rays = rotate(RayBatch([0, 0, 0], dirs), R)
+    np.testing.assert_allclose(rays.dir, dirs @ R.T, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(rays[3].dir, R @ dirs[3], rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('reduce, expected', [
+    (add, [[5, 7, 9], [12, 15, 18]]),
+    (sub, [[-3, -3, -3], [-10, -11, -12]]),
+    (mul, [[4, 10, 18], [28, 80, 162]]),
+    (div, [[0.25, 0.4, 0.5], [1 / 28, 0.05, 1 / 18]]),
+])
+def test_point_reductions(reduce, expected):
+    xyz = [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    for n, values in zip((2, 3), expected):
+        points = [Point(row) for row in xyz[:n]]
+        result = reduce(points)
+        assert isinstance(result, Point)
+        np.testing.assert_allclose(result.xyz, values, rtol=1e-6)
+
+        # Inputs are left unmodified
+        for point, row in zip(points, xyz):
+            np.testing.assert_array_equal(point.xyz, row)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from asp import objects
+from asp.objects import (_BLAS_MIN_ROWS, Camera, Point, PointArray, Ray, RayBatch, Triangle,
+                         Vector)
+
+
+@pytest.mark.parametrize('points', [[[0, 0, 0], [1, 1, 1], [2, 2, 2]],
+                                    [[0, 0, 0], [0, 0, 0], [1, 0, 0]]])
+def test_degenerate_triangle_has_nan_normal(points):
+    triangle = Triangle(np.array(points, dtype=float))
+    assert np.isnan(triangle.normal.dir).all()
+    assert np.isnan(triangle.get_coefficients()).all()
+
+
+def test_triangle_normal_is_unit():
+    triangle = Triangle(np.array([[0, 0, 1], [2, 0, 1], [0, 2, 1]], dtype=float))
+    np.testing.assert_allclose(triangle.normal.dir, [0, 0, 1])
+    np.testing.assert_allclose(triangle.get_coefficients(), [0, 0, 1, -1])
+
+
+def test_generate_rays_matches_rays():
+    camera = Camera(Vector([1, 2, 3], [1, -1, 2]), 1., (6, 4), (0.1, 0.2))
+    origins, dirs = camera.rays()
+    unit = camera.generate_rays()
+    assert unit.shape == (24, 3)
+    assert unit.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(unit, axis=1), 1, rtol=1e-6)
+    np.testing.assert_allclose(unit, dirs / np.linalg.norm(dirs, axis=1, keepdims=True),
+                               rtol=1e-6)
+
+    # Rows run over y fastest, and the optical axis follows orient.dir
+    assert unit[0, 1] < unit[1, 1]
+    centre = unit.reshape(6, 4, 3)[3, 2]
+    np.testing.assert_allclose(centre, np.array([1, -1, 2]) / np.sqrt(6), atol=1e-6)
+
+
+def test_dtype_reaches_every_class(monkeypatch):
+    monkeypatch.setattr(objects, 'DTYPE', np.float64)
+    xyz = [[0, 0, 1], [1, 0, 1], [0, 1, 1]]
+    assert Point([0, 0, 0]).xyz.dtype == np.float64
+    assert Vector([0, 0, 0], [0, 0, 1]).dir.dtype == np.float64
+    assert Ray([0, 0, 0], [0, 0, 1]).xyz.dtype == np.float64
+    assert PointArray(xyz).xyz.dtype == np.float64
+    assert RayBatch([0, 0, 0], xyz).dir.dtype == np.float64
+    assert Triangle(np.array(xyz)).v0.dtype == np.float64
+    camera = Camera(Vector([0, 0, 0], [0, 0, 1]), 1., (3, 2), (0.1, 0.1))
+    assert camera.rays()[1].dtype == np.float64
+
+
+@pytest.mark.parametrize('build', [lambda xyz: xyz, PointArray,
+                                   lambda xyz: [Point(row) for row in xyz]])
+def test_triangle_geometry_is_fixed(build):
+    xyz = np.array([[0, 0, 1], [1, 0, 1], [0, 1, 1]], dtype=np.float32)
+    points = build(xyz)
+    triangle = Triangle(points)
+    triangle.points[0].shiftby([0, 0, 5])
+    if isinstance(points, list):
+        points[1].shiftby([0, 0, 5])
+    xyz[2] = 7
+
+    np.testing.assert_array_equal(triangle.v0, [0, 0, 1])
+    np.testing.assert_array_equal(triangle.edge1, [1, 0, 0])
+    np.testing.assert_array_equal(triangle.edge2, [0, 1, 0])
+    np.testing.assert_array_equal(triangle.bbox_max, [1, 1, 1])
+    np.testing.assert_array_equal(triangle.get_coefficients(), [0, 0, 1, -1])
+    with pytest.raises(ValueError):
+        triangle.v0[2] = 5
+
+
+def test_rays_match_across_rotation_paths():
+    camera = Camera(Vector([1, 2, 3], [1, -1, 2]), 1., (40, 30), (0.01, 0.02))
+    assert 40 * 30 >= _BLAS_MIN_ROWS > 100
+
+    # One tile above the cutoff rotates with BLAS, small tiles with rotate_batch
+    origins, dirs = camera.rays()
+    tiles = list(camera.iter_ray_tiles(tile=100))
+    np.testing.assert_allclose(np.concatenate([tile[1] for tile in tiles]), dirs,
+                               rtol=1e-6, atol=1e-7)
+    np.testing.assert_array_equal(np.concatenate([tile[0] for tile in tiles]), origins)
+
+
+@pytest.mark.parametrize('array_size', [(0, 5), (4, 0)])
+def test_rays_without_pixels(array_size):
+    camera = Camera(Vector([0, 0, 0], [0, 0, 1]), 1., array_size, (0.1, 0.1))
+    origins, dirs = camera.rays()
+    assert origins.shape == dirs.shape == (0, 3)
+    assert camera.generate_rays().shape == (0, 3)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from asp import _kernels
+from asp.objects import Camera, Vector
+from asp.render import snapshot
+
+
+@pytest.mark.parametrize('position', [[0, 0, 0], [1, -2, 0.5]])
+def test_snapshot_closed_mesh_has_no_holes(cube, position, direction):
+    camera = Camera(Vector(position, direction), 1., (10, 10), (0.2, 0.2))
+    assert snapshot(camera, cube).all()
+
+
+def test_render_kernel_hits_shared_edges(cube, edge_rays):
+    origins, dirs = edge_rays
+    V0 = np.stack([triangle.v0 for triangle in cube])
+    edge1 = np.stack([triangle.edge1 for triangle in cube])
+    edge2 = np.stack([triangle.edge2 for triangle in cube])
+    bbox = np.stack([np.concatenate([triangle.bbox_min, triangle.bbox_max])
+                     for triangle in cube])
+    out = np.empty(len(dirs), dtype=np.uint8)
+    _kernels.render_kernel(origins, dirs, V0, edge1, edge2, bbox, out)
+    assert out.all()
+
+
+def test_snapshot_accepts_generator(cube):
+    camera = Camera(Vector([0, 0, 0], [0, 0, 1]), 1., (10, 10), (0.2, 0.2))
+    np.testing.assert_array_equal(snapshot(camera, (triangle for triangle in cube)),
+                                  snapshot(camera, cube))
+
+
+def test_snapshot_empty_scene():
+    camera = Camera(Vector([0, 0, 0], [0, 0, 1]), 1., (10, 8), (0.2, 0.2))
+    image = snapshot(camera, [])
+    assert image.shape == (10, 8)
+    assert image.dtype == np.uint8
+    assert not image.any()
+
+
+def test_snapshot_tiles_match_single_tile(cube):
+    # Half of the +z face, so the image holds both hits and misses
+    triangles = cube[1000:1100]
+    camera = Camera(Vector([1, -2, 0.5], [1, 2, 3]), 1., (13, 9), (0.1, 0.15))
+    image = snapshot(camera, triangles)
+    assert 0 < image.sum() < image.size
+    np.testing.assert_array_equal(snapshot(camera, triangles, tile=7), image)